@@ -1,13 +1,20 @@
-import requests
-import json
+import asyncio
+import aiohttp
+import orjson
 import logging
-from collections import Counter
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
 application_id = [22019]  # Add more IDs as needed
 
+REQUEST_TIMEOUT = (3, 10)  # (connect, read) seconds
+REQUEST_RETRIES = 3
+RETRY_BACKOFF = 0.3  # seconds, doubled after every failed attempt
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
 
 # API URLs for BNPL, Wage Advance, and Non-SACC Loans
 API_URLS = {
@@ -16,13 +23,26 @@ API_URLS = {
     "Non-SACC Loans": "https://app.cashfaster.com.au/bank-statement/get-factor/non_sacc_loans",
 }
 
+async def get_with_retries(session, url):
+    # Transient failures (connection errors, timeouts, RETRY_STATUSES) are retried with backoff
+    for attempt in range(REQUEST_RETRIES + 1):
+        try:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.read()
+        except aiohttp.ClientResponseError as e:
+            if e.status not in RETRY_STATUSES or attempt == REQUEST_RETRIES:
+                raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == REQUEST_RETRIES:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
 # 1. Data Extraction
-def fetch_data(url):
+async def fetch_data(session, url):
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return orjson.loads(await get_with_retries(session, url))
+    except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
         logging.error(f"Data extraction failed for URL {url}: {e}")
         return None
 
@@ -48,48 +68,76 @@ def initialize_category_totals():
     return category_totals
 
 # 3. Parse and Clean Data
-def parse_statement_analysis(raw_data):
+def parse_statement_analysis(raw_data, categories=frozenset(API_URLS)):
     bank_accounts = raw_data.get("illionBankAccount", [])
     all_analyses = []
     for account in bank_accounts:
         statement_analysis_str = account.get("statementAnalysis", "[]")
         try:
-            statement_analysis = json.loads(statement_analysis_str)
+            statement_analysis = orjson.loads(statement_analysis_str)
             if isinstance(statement_analysis, list):
-                all_analyses.extend(statement_analysis)
-        except json.JSONDecodeError:
+                all_analyses.extend(
+                    entry
+                    for entry in statement_analysis
+                    if isinstance(entry, dict) and entry.get("analysisCategory", {}).get("name") in categories
+                )
+        except orjson.JSONDecodeError:
             logging.error("Failed to parse statement analysis.")
             continue
     return all_analyses
 
 # 4. Fetch third-party keywords for BNPL, Wage Advance, and Non-SACC Loans
-def fetch_keywords(category):
+async def fetch_keywords(session, category):
     api_url = API_URLS.get(category)
     if not api_url:
-        return []
+        return frozenset()
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()
-        data = response.json().get("data", [])
-        return data
-    except requests.exceptions.RequestException as e:
+        data = orjson.loads(await get_with_retries(session, api_url)).get("data", [])
+        return frozenset(keyword for keyword in data if isinstance(keyword, str))
+    except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
         logging.error(f"Failed to fetch keywords for {category}: {e}")
-        return []
+        return frozenset()
+
+async def fetch_all_keywords(session):
+    keyword_sets = await asyncio.gather(*(fetch_keywords(session, category) for category in API_URLS))
+    return dict(zip(API_URLS, keyword_sets))
+
+def get_group_transactions(group):
+    transactions = group.get("transactions", [])
+    if isinstance(transactions, str):
+        transactions = orjson.loads(transactions)
+        group["transactions"] = transactions  # avoid re-parsing duplicated entries
+    return transactions
+
+def get_group_amounts(group):
+    # Amount column cached on the group; non-numeric amounts become NaN so they never pass a > 0 mask
+    if "_amt" not in group:
+        transactions = get_group_transactions(group)
+        group["_amt"] = np.fromiter(
+            (
+                amount if isinstance(amount := transaction.get("amount", 0), (int, float)) else np.nan
+                for transaction in transactions
+                if isinstance(transaction, dict)
+            ),
+            dtype=np.float64,
+        )
+    return group["_amt"]
+
+# 5. Calculate BNPL, Wage Advance, and Non-SACC Loans in a single pass
+def calculate_category_totals(statement_analysis, keywords):
+    totals = {category: 0.0 for category in keywords}
+    for category, third_party_keywords in keywords.items():
+        if not third_party_keywords:
+            logging.info(f"No keywords found for {category}. Skipping calculation.")
 
-# 5. Calculate BNPL, Wage Advance, and Non-SACC Loans
-def calculate_category_totals(statement_analysis, category):
-    third_party_keywords = fetch_keywords(category)
-    if not third_party_keywords:
-        logging.info(f"No keywords found for {category}. Skipping calculation.")
-        return 0.0
-
-    total_amount = 0.0
     for entry in statement_analysis:
         if not isinstance(entry, dict):
             continue
 
         analysis_category = entry.get("analysisCategory", {})
-        if analysis_category.get("name") != category:
+        category = analysis_category.get("name")
+        third_party_keywords = keywords.get(category)
+        if not third_party_keywords:
             continue
 
         for group in analysis_category.get("transactionGroups", []):
@@ -97,60 +145,77 @@ def calculate_category_totals(statement_analysis, category):
             if third_party not in third_party_keywords:
                 continue
 
-            transactions = group.get("transactions", [])
-            if isinstance(transactions, str):
-                try:
-                    transactions = json.loads(transactions)
-                except json.JSONDecodeError:
-                    logging.error("Failed to parse transactions JSON.")
-                    continue
+            try:
+                amounts = get_group_amounts(group)
+            except orjson.JSONDecodeError:
+                logging.error("Failed to parse transactions JSON.")
+                continue
 
-            for transaction in transactions:
-                amount = transaction.get("amount", 0)
-                if isinstance(amount, (int, float)) and amount > 0:
-                    total_amount += amount
+            totals[category] += float(amounts[amounts > 0].sum())
 
-    return total_amount
+    return totals
 
 # 6. Accumulate Metrics from Statement Analysis
-def accumulate_metrics(statement_analysis, category_totals):
+def accumulate_metrics(statement_analysis, category_totals, keywords):
     logging.info("Calculating BNPL, Wage Advance, and Non-SACC Loans...")
-    category_totals["BNPL"] = calculate_category_totals(statement_analysis, "BNPL")
-    category_totals["Wage Advance"] = calculate_category_totals(statement_analysis, "Wage Advance")
-    category_totals["Non-SACC Loans"] = calculate_category_totals(statement_analysis, "Non-SACC Loans")
+    category_totals.update(calculate_category_totals(statement_analysis, keywords))
     logging.info(f"BNPL Total: ${category_totals['BNPL']:.2f}")
     logging.info(f"Wage Advance Total: ${category_totals['Wage Advance']:.2f}")
     logging.info(f"Non-SACC Loans Total: ${category_totals['Non-SACC Loans']:.2f}")
 
-# 7. Main Logic
-def main():
-    all_outputs = []
-    for loan_id in application_id:
-        url = f"https://admin.cashfaster.com.au/bank-statement/{loan_id}"
-        raw_data = fetch_data(url)
-        if raw_data is None:
-            continue
-
-        statement_analysis = parse_statement_analysis(raw_data)
-        category_totals = initialize_category_totals()
-        accumulate_metrics(statement_analysis, category_totals)
+# Runs in a worker process: parsing and categorising only, no network access
+def process_loan(loan_id, raw_data, keywords):
+    statement_analysis = parse_statement_analysis(raw_data)
+    category_totals = initialize_category_totals()
+    accumulate_metrics(statement_analysis, category_totals, keywords)
 
-        # Generate and save output
-        output = f"""
+    return f"""
         Loan ID: {loan_id}
         BNPL: ${category_totals["BNPL"]:.2f}
         Wage Advance: ${category_totals["Wage Advance"]:.2f}
         Non-SACC Loans: ${category_totals["Non-SACC Loans"]:.2f}
         """
-        all_outputs.append(output)
+
+# 7. Main Logic
+async def main():
+    # Pooled keep-alive connections; aiohttp negotiates gzip by default
+    connector = aiohttp.TCPConnector(limit=32)
+    timeout = aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1])
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # Fetch every loan and the keyword lists concurrently
+        tasks = [
+            fetch_data(session, f"https://admin.cashfaster.com.au/bank-statement/{loan_id}")
+            for loan_id in application_id
+        ]
+        all_raw_data, keywords = await asyncio.gather(asyncio.gather(*tasks), fetch_all_keywords(session))
+
+    loans = [
+        (loan_id, raw_data)
+        for loan_id, raw_data in zip(application_id, all_raw_data)
+        if raw_data is not None
+    ]
+
+    # Per-loan work is CPU-bound and independent, so batches run on every core
+    if len(loans) > 1:
+        with ProcessPoolExecutor() as executor:
+            all_outputs = list(executor.map(
+                process_loan,
+                [loan_id for loan_id, _ in loans],
+                [raw_data for _, raw_data in loans],
+                [keywords] * len(loans),
+            ))
+    else:
+        all_outputs = [process_loan(loan_id, raw_data, keywords) for loan_id, raw_data in loans]
+
+    for output in all_outputs:
         logging.info(output)
 
     try:
         with open("output.txt", "w") as file:
-            file.writelines(all_outputs)
+            file.write("".join(all_outputs))
         logging.info("Results saved to output.txt")
     except IOError as e:
         logging.error(f"Failed to save results: {e}")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
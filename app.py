@@ -1,25 +1,61 @@
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from main import fetch_data, initialize_category_totals, parse_decision_metrics, parse_statement_analysis, categorize_data, calculate_totals, format_output
+from main import create_async_session, fetch_data_async, process_loan_async
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # One pooled client for the app's lifetime, shared by every request
+    app.state.http_session = create_async_session()
+    yield
+    await app.state.http_session.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Processed loan responses, keyed on loan_id: {loan_id: (expires_at, response)}
+RESPONSE_CACHE_TTL = 300  # seconds
+RESPONSE_CACHE_MAXSIZE = 1024
+_response_cache = {}
+
+def get_cached_response(loan_id):
+    cached = _response_cache.get(loan_id)
+    if cached is None:
+        return None
+    expires_at, response = cached
+    if expires_at < time.monotonic():
+        _response_cache.pop(loan_id, None)
+        return None
+    return response
+
+def cache_response(loan_id, response):
+    if loan_id not in _response_cache and len(_response_cache) >= RESPONSE_CACHE_MAXSIZE:
+        # Evict the oldest entry
+        _response_cache.pop(next(iter(_response_cache)), None)
+    _response_cache[loan_id] = (time.monotonic() + RESPONSE_CACHE_TTL, response)
 
 @app.get("/")
 def root():
     return {"message": "Welcome to the Loan Processing API"}
 
 @app.get("/process-loan/{loan_id}")
-def process_loan(loan_id: int):
+async def process_loan(loan_id: int):
+    cached = get_cached_response(loan_id)
+    if cached is not None:
+        return cached
+
+    session = app.state.http_session
     url = f"https://admin.cashfaster.com.au/bank-statement/{loan_id}"
-    raw_data = fetch_data(url)
+    raw_data = await fetch_data_async(session, url)
     if raw_data is None:
         raise HTTPException(status_code=404, detail=f"Loan ID {loan_id} not found.")
 
-    decision_metrics = parse_decision_metrics(raw_data)
-    statement_analysis = parse_statement_analysis(raw_data)
-    category_totals = initialize_category_totals()
-    categorize_data(decision_metrics, category_totals, statement_analysis)
+    output = await process_loan_async(session, loan_id, raw_data)
+
+    response = {"output": output}
+    cache_response(loan_id, response)
+    return response
 
-    total_income, total_expenses, surplus = calculate_totals(category_totals)
-    output = format_output(raw_data, category_totals, total_income, total_expenses, surplus, loan_id)
-    
-    return {"output": output}
+@app.delete("/process-loan/{loan_id}/cache")
+def clear_loan_cache(loan_id: int):
+    _response_cache.pop(loan_id, None)
+    return {"message": f"Cache cleared for Loan ID {loan_id}."}
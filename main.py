@@ -1,7 +1,11 @@
-import requests
-import json
+import asyncio
+import aiohttp
+import orjson
 import logging
-from collections import Counter
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from numba import njit
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,186 +16,311 @@ application_id = [22019]  # Add more IDs as needed
 # API URL templates for SACC Loan calculations
 API_URL_LESS_THAN_300 = "https://app.cashfaster.com.au/bank-statement/loan-calculator/{amount}/2/fortnightly"
 API_URL_GREATER_OR_EQUAL_300 = "https://app.cashfaster.com.au/bank-statement/loan-calculator/{amount}/5/fortnightly"
+API_URL_BATCH = "https://app.cashfaster.com.au/bank-statement/loan-calculator/batch"
+
+REQUEST_TIMEOUT = (3, 10)  # (connect, read) seconds
+REQUEST_RETRIES = 3
+RETRY_BACKOFF = 0.3  # seconds, doubled after every failed attempt
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+async def request_with_retries(session, method, url, **kwargs):
+    # Connection errors, timeouts and the statuses above are retried with backoff;
+    # any other error status is raised straight away
+    for attempt in range(REQUEST_RETRIES + 1):
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                response.raise_for_status()
+                return await response.read()
+        except aiohttp.ClientResponseError as e:
+            if e.status not in RETRY_STATUSES or attempt == REQUEST_RETRIES:
+                raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == REQUEST_RETRIES:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
 
 # 1. Data Extraction
-def fetch_data(url):
+async def fetch_data_async(session, url):
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return orjson.loads(await request_with_retries(session, "GET", url))
+    except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
         logging.error(f"Data extraction failed for URL {url}: {e}")
         return None
 
 # 2. Define Income and Expense Categories
-income_categories = {
-    "Wages - Monthly": "Wages",
-    "Centrelink - Monthly": "Centrelink",
-}
-
-expense_categories = {
-    "SACC Loans - Monthly": "SACC",
-    "Debt Collection - Monthly": "Debt Collection"
-}
-
-# Initialize category totals
-def initialize_category_totals():
-    category_totals = {label: 0.0 for label in income_categories.values()}
-    category_totals.update({label: 0.0 for label in expense_categories.values()})
-    category_totals["Living Expenses"] = 0.0  # Initialize Living Expenses separately
-    return category_totals
+@dataclass(slots=True)
+class CategoryTotals:
+    # Income
+    wages: float = 0.0
+    centrelink: float = 0.0
+    # Expenses
+    sacc: dict = field(default_factory=dict)  # third party -> fortnightly repayment
+    debt_collection: float = 0.0
+    living_expenses: float = 0.0
+    rent: float = 0.0
+    gambling: float = 0.0
+    insurance: float = 0.0
+
+# Decision metrics after "Rent - Monthly" that are not counted as living expenses
+living_expenses_excluded = frozenset({
+    "Insurance - Monthly",
+    "Wages - Monthly",
+    "Centrelink - Monthly",
+    "SACC Loans - Monthly",
+    "All Loans - Monthly",
+})
+ONCE_OFF_SUFFIX = " (Once off)"
+
+# Statement analysis categories used by the metrics below; everything else is dropped right after parsing
+statement_analysis_categories = frozenset({"SACC Loans", "Rent", "Insurance", "Wages", "Centrelink", "Gambling"})
 
 # 3. Parse and Clean Data
 def parse_decision_metrics(raw_data):
     customer_info = raw_data.get("illionCustomerInfo", {})
     decision_metrics_str = customer_info.get("decisionMetrics", "[]")
     try:
-        decision_metrics = json.loads(decision_metrics_str)
+        decision_metrics = orjson.loads(decision_metrics_str)
         return decision_metrics
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logging.error("Failed to parse decision metrics.")
         return []
 
-def parse_statement_analysis(raw_data):
+def parse_statement_analysis(raw_data, categories=statement_analysis_categories):
     bank_accounts = raw_data.get("illionBankAccount", [])
     all_analyses = []
     
     for account in bank_accounts:
         statement_analysis_str = account.get("statementAnalysis", "[]")
         try:
-            statement_analysis = json.loads(statement_analysis_str)
+            statement_analysis = orjson.loads(statement_analysis_str)
             if isinstance(statement_analysis, list):
-                all_analyses.extend(statement_analysis)
-        except json.JSONDecodeError:
+                all_analyses.extend(
+                    entry
+                    for entry in statement_analysis
+                    if isinstance(entry, dict) and entry.get("analysisCategory", {}).get("name") in categories
+                )
+        except orjson.JSONDecodeError:
             logging.error("Failed to parse statement analysis.")
             continue
     
     return all_analyses
 
+def index_analysis_points(analysis_category):
+    # Reversed so the first point with a given name wins, as a linear scan would
+    return {
+        point.get("name"): point.get("value", 0)
+        for point in reversed(analysis_category.get("analysisPoints", []))
+    }
+
 def get_amount_from_analysis_category(analysis_category, key="totalAmount"):
-    for point in analysis_category.get("analysisPoints", []):
-        if point.get("name") == key:
-            try:
-                value = point.get("value", 0)
-                return abs(float(value)) if isinstance(value, (str, int, float)) else 0.0
-            except (ValueError, TypeError):
-                logging.error(f"Error converting value for {key}")
-                return 0.0
+    points = index_analysis_points(analysis_category)
+    if key in points:
+        try:
+            value = points[key]
+            return abs(float(value)) if isinstance(value, (str, int, float)) else 0.0
+        except (ValueError, TypeError):
+            logging.error(f"Error converting value for {key}")
+            return 0.0
 
-    amount = 0.0
     transaction_groups = analysis_category.get("transactionGroups", [])
+    amounts = np.fromiter(iter_transaction_amounts(transaction_groups), dtype=np.float64)
+    return float(np.abs(amounts).sum())
+
+def iter_transaction_amounts(transaction_groups):
     for group in transaction_groups:
-        transactions = group.get("transactions", [])
-        for transaction in transactions:
+        for transaction in group.get("transactions", []):
             try:
-                transaction_amount = transaction.get("amount", 0)
-                amount += abs(float(transaction_amount))
+                yield float(transaction.get("amount", 0))
             except (ValueError, TypeError):
                 continue
 
-    return amount
-
-def get_top_recurring_transaction_amount(transactions):
-    amounts = [
-        abs(float(transaction.get("amount", 0)))
-        for transaction in transactions
-        if isinstance(transaction.get("amount"), (int, float)) and transaction.get("amount") < 0
-    ]
-    if not amounts:
+# Amounts closer together than this are treated as the same recurring payment
+RECURRING_EPSILON = 1e-9
+RECURRING_MIN_COUNT = 3
+
+@njit(cache=True)
+def _top_recurring(amounts):
+    n = amounts.shape[0]
+    # Stable sort keeps equal amounts in first-seen order
+    order = np.argsort(amounts, kind="mergesort")
+
+    best_index = n
+    run_start = 0
+    run_first = n
+    for i in range(n):
+        if i > run_start and amounts[order[i]] - amounts[order[i - 1]] > RECURRING_EPSILON:
+            if i - run_start >= RECURRING_MIN_COUNT and run_first < best_index:
+                best_index = run_first
+            run_start = i
+            run_first = n
+        if order[i] < run_first:
+            run_first = order[i]
+
+    if n - run_start >= RECURRING_MIN_COUNT and run_first < best_index:
+        best_index = run_first
+
+    # Earliest-seen recurring amount wins when several repeat
+    return amounts[best_index] if best_index < n else 0.0
+
+def get_top_recurring_transaction_amount(amounts):
+    debits = amounts[amounts < 0]
+    if debits.size == 0:
         return 0.0
 
-    frequency = Counter(amounts)
-    for amount, count in frequency.items():
-        if count >= 3:
-            return amount
+    return float(_top_recurring(np.abs(debits)))
 
-    return 0.0
+def get_group_transactions(group):
+    transactions = group.get("transactions", [])
+    if isinstance(transactions, str):
+        # Parse stringified transactions once and keep the result on the group
+        transactions = orjson.loads(transactions)
+        group["transactions"] = transactions
+    return transactions
 
-def calculate_sacc_loans(statement_analysis):
-    sacc_results = {}
-    for entry in statement_analysis:
-        if not isinstance(entry, dict):
-            continue
+def get_transaction_amount(transaction):
+    amount = transaction.get("amount", 0) if isinstance(transaction, dict) else None
+    return amount if isinstance(amount, (int, float)) else np.nan
 
-        analysis_category = entry.get("analysisCategory", {})
-        if analysis_category.get("name") != "SACC Loans":
+def is_credit_transaction(transaction):
+    return isinstance(transaction, dict) and any(
+        isinstance(tag, dict) and tag.get("creditDebit") == "credit"
+        for tag in transaction.get("tags", [])
+    )
+
+def get_group_amounts(group):
+    # Amount column for a group, NaN where the amount is not numeric
+    transactions = get_group_transactions(group)
+    return np.fromiter(map(get_transaction_amount, transactions), dtype=np.float64, count=len(transactions))
+
+def get_group_credit_flags(group):
+    transactions = get_group_transactions(group)
+    return np.fromiter(map(is_credit_transaction, transactions), dtype=np.bool_, count=len(transactions))
+
+def collect_sacc_loan_amounts(analysis_category, sacc_results):
+    for group in analysis_category.get("transactionGroups", []):
+        third_party = group.get("name", "Unknown")
+        try:
+            amounts = get_group_amounts(group)
+            is_credit = get_group_credit_flags(group)
+        except orjson.JSONDecodeError:
+            logging.error("Failed to parse transactions JSON.")
             continue
 
-        for group in analysis_category.get("transactionGroups", []):
-            third_party = group.get("name", "Unknown")
-            transactions = group.get("transactions", [])
-            
-            if isinstance(transactions, str):
-                try:
-                    transactions = json.loads(transactions)
-                except json.JSONDecodeError:
-                    logging.error("Failed to parse transactions JSON.")
-                    continue
+        credited = np.flatnonzero(is_credit & (amounts > 0))
+        if credited.size:
+            sacc_results[third_party] = float(amounts[credited[0]])
+
+def get_sacc_term(total_amount):
+    return 2 if total_amount < 300 else 5
+
+def get_sacc_api_url(total_amount):
+    if total_amount < 300:
+        return API_URL_LESS_THAN_300.format(amount=int(total_amount))
+    return API_URL_GREATER_OR_EQUAL_300.format(amount=int(total_amount))
+
+def build_sacc_batch_payload(sacc_results):
+    return {
+        "items": [
+            {"amount": int(total_amount), "term": get_sacc_term(total_amount), "freq": "fortnightly"}
+            for total_amount in sacc_results.values()
+        ]
+    }
+
+def parse_batch_repayments(sacc_results, data):
+    # Results come back in the same order as the submitted items; parties
+    # without a usable result here are looked up individually by the caller
+    items = data.get("items", []) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return {}
+    return {
+        third_party: parse_repayment_amount(third_party, item)
+        for third_party, item in zip(sacc_results, items)
+        if isinstance(item, dict) and item.get("repayment_amount") is not None
+    }
+
+def parse_repayment_amount(third_party, data):
+    repayment_amount_str = data.get("repayment_amount", "0.0")
+    try:
+        repayment_amount = float(repayment_amount_str)
+    except (TypeError, ValueError):
+        logging.error(f"Invalid repayment amount format for {third_party}: {repayment_amount_str}")
+        repayment_amount = 0.0
 
-            for transaction in transactions:
-                if not isinstance(transaction, dict):
-                    continue
+    logging.info(f"{third_party} SACC Loan: ${repayment_amount:.2f}")
+    return repayment_amount
 
-                tags = transaction.get("tags", [])
-                is_credit = any(
-                    isinstance(tag, dict) and tag.get("creditDebit") == "credit"
-                    for tag in tags
-                )
-                
-                if is_credit:
-                    amount = transaction.get("amount", 0)
-                    if isinstance(amount, (int, float)) and amount > 0:
-                        sacc_results[third_party] = amount
-                        break
+# Statuses meaning the server has no batch endpoint, as opposed to a failed batch
+BATCH_UNSUPPORTED_STATUSES = frozenset({404, 405, 501})
+# Flipped off the first time the batch endpoint is reported unsupported, so later loans go straight to per-amount calls
+_batch_endpoint_available = True
 
-    sacc_totals = {}
-    for third_party, total_amount in sacc_results.items():
-        try:
-            if total_amount < 300:
-                api_url = API_URL_LESS_THAN_300.format(amount=int(total_amount))
-            else:
-                api_url = API_URL_GREATER_OR_EQUAL_300.format(amount=int(total_amount))
+async def fetch_sacc_repayment_async(session, third_party, total_amount):
+    try:
+        api_url = get_sacc_api_url(total_amount)
+        logging.info(f"Calling API for {third_party}: {api_url}")
+        data = orjson.loads(await request_with_retries(session, "GET", api_url))
+        return parse_repayment_amount(third_party, data)
 
-            logging.info(f"Calling API for {third_party}: {api_url}")
-            response = requests.get(api_url)
-            response.raise_for_status()
+    except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+        logging.error(f"API call failed for {third_party}: {e}")
+        return None
 
-            repayment_amount_str = response.json().get("repayment_amount", "0.0")
-            try:
-                repayment_amount = float(repayment_amount_str)
-            except ValueError:
-                logging.error(f"Invalid repayment amount format for {third_party}: {repayment_amount_str}")
-                repayment_amount = 0.0
+async def fetch_sacc_repayments_async(session, sacc_results):
+    global _batch_endpoint_available
+    sacc_totals = {}
+    if not sacc_results:
+        return sacc_totals
 
-            sacc_totals[third_party] = repayment_amount
-            logging.info(f"{third_party} SACC Loan: ${repayment_amount:.2f}")
+    if _batch_endpoint_available:
+        try:
+            logging.info(f"Calling batch API for {len(sacc_results)} SACC loans: {API_URL_BATCH}")
+            body = await request_with_retries(
+                session, "POST", API_URL_BATCH, json=build_sacc_batch_payload(sacc_results)
+            )
+            sacc_totals = parse_batch_repayments(sacc_results, orjson.loads(body))
 
-        except requests.exceptions.RequestException as e:
-            logging.error(f"API call failed for {third_party}: {e}")
+        except aiohttp.ClientResponseError as e:
+            if e.status in BATCH_UNSUPPORTED_STATUSES:
+                logging.info("Batch loan calculator not available, falling back to per-amount calls.")
+                _batch_endpoint_available = False
+            else:
+                logging.error(f"Batch API call failed for SACC loans, falling back to per-amount calls: {e}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+            logging.error(f"Batch API call failed for SACC loans, falling back to per-amount calls: {e}")
+
+    # Anything the batch call didn't answer goes to the per-amount URLs, all at once
+    remaining = {party: amount for party, amount in sacc_results.items() if party not in sacc_totals}
+    repayments = await asyncio.gather(
+        *(fetch_sacc_repayment_async(session, party, amount) for party, amount in remaining.items())
+    )
+    for third_party, repayment in zip(remaining, repayments):
+        if repayment is not None:
+            sacc_totals[third_party] = repayment
 
     return sacc_totals
 
+def apply_sacc_totals(category_totals, sacc_totals):
+    if sacc_totals:
+        category_totals.sacc = sacc_totals
+        logging.info(f"Total SACC Loans: ${sum(sacc_totals.values()):.2f}")
 
 def accumulate_metrics_from_statement_analysis(statement_analysis, category_totals):
     logging.info("Parsing and accumulating metrics from all statement analysis entries...")
 
     # Reset all values to ensure clean calculation
-    category_totals["Rent"] = 0.0
-    category_totals["Centrelink"] = 0.0
-    category_totals["Gambling"] = 0.0
-    category_totals["SACC"] = {}  # Change to a dictionary
-    category_totals["Debt Collection"] = 0.0
-    category_totals["Wages"] = 0.0
-    category_totals["Insurance"] = 0.0
-
-    # Calculate SACC loans first
-    sacc_totals = calculate_sacc_loans(statement_analysis)
-    if sacc_totals:
-        category_totals["SACC"] = sacc_totals
-        logging.info(f"Total SACC Loans: ${sum(sacc_totals.values()):.2f}")
+    category_totals.rent = 0.0
+    category_totals.centrelink = 0.0
+    category_totals.gambling = 0.0
+    category_totals.sacc = {}
+    category_totals.debt_collection = 0.0
+    category_totals.wages = 0.0
+    category_totals.insurance = 0.0
 
+    sacc_results = {}
     rent_found = False
 
+    # Single pass over every category; SACC repayments need the network, so the
+    # collected amounts are returned for the caller to look up
     for item in statement_analysis:
         if not isinstance(item, dict):
             continue
@@ -199,57 +328,58 @@ def accumulate_metrics_from_statement_analysis(statement_analysis, category_tota
         analysis_category = item.get("analysisCategory", {})
         category_name = analysis_category.get("name")
 
-        if category_name == "Rent":
+        if category_name == "SACC Loans":
+            collect_sacc_loan_amounts(analysis_category, sacc_results)
+
+        elif category_name == "Rent":
             rent_found = True
-            transactions = analysis_category.get("transactionGroups", [])
-            all_transactions = []
-            for group in transactions:
-                all_transactions.extend(group.get("transactions", []))
-            rent_amount = get_top_recurring_transaction_amount(all_transactions)
-            category_totals["Rent"] += rent_amount
+            amount_columns = []
+            for group in analysis_category.get("transactionGroups", []):
+                try:
+                    amount_columns.append(get_group_amounts(group))
+                except orjson.JSONDecodeError:
+                    logging.error("Failed to parse transactions JSON.")
+            all_amounts = np.concatenate(amount_columns) if amount_columns else np.empty(0)
+            rent_amount = get_top_recurring_transaction_amount(all_amounts)
+            category_totals.rent += rent_amount
 
         elif category_name == "Insurance":
             insurance_amount = get_amount_from_analysis_category(analysis_category, "averageTransactionAmount")
             if insurance_amount > 0:
-                category_totals["Insurance"] += insurance_amount
+                category_totals.insurance += insurance_amount
 
         elif category_name == "Wages":
             wages_amount = get_amount_from_analysis_category(analysis_category, "averageTransactionAmount")
             if wages_amount > 0:
-                category_totals["Wages"] += wages_amount
+                category_totals.wages += wages_amount
 
         elif category_name == "Centrelink":
             centrelink_amount = get_amount_from_analysis_category(analysis_category, "averageTransactionAmount")
             if centrelink_amount > 0:
-                category_totals["Centrelink"] = centrelink_amount  # Use = instead of += to avoid double counting
+                category_totals.centrelink = centrelink_amount  # Use = instead of += to avoid double counting
 
         elif category_name == "Gambling":
-            total_debits = sum(
-                float(entry.get("value", 0))
-                for entry in analysis_category.get("analysisPoints", [])
-                if entry.get("name") == "totalAmountDebits"
-            )
-            total_credits = sum(
-                float(entry.get("value", 0))
-                for entry in analysis_category.get("analysisPoints", [])
-                if entry.get("name") == "totalAmountCredits"
-            )
+            points = index_analysis_points(analysis_category)
+            total_debits = float(points.get("totalAmountDebits", 0))
+            total_credits = float(points.get("totalAmountCredits", 0))
             net_gambling = total_debits - total_credits
             if net_gambling > 0:
                 gambling_fortnightly = round(((net_gambling / 6) * 12) / 26, 2)
             else:
                 gambling_fortnightly = 0.0
-            category_totals["Gambling"] += gambling_fortnightly
+            category_totals.gambling += gambling_fortnightly
 
     if not rent_found:
-        category_totals["Rent"] = 0.0
+        category_totals.rent = 0.0
+
+    return sacc_results
 
 def categorize_data(decision_metrics, category_totals, statement_analysis):
     # First accumulate statement analysis metrics
-    accumulate_metrics_from_statement_analysis(statement_analysis, category_totals)
+    sacc_results = accumulate_metrics_from_statement_analysis(statement_analysis, category_totals)
     
     # Store the Centrelink value from statement analysis
-    centrelink_from_statement = category_totals["Centrelink"]
+    centrelink_from_statement = category_totals.centrelink
 
     # Carefully calculate living expenses by summing up all expenses
     living_expenses_total = 0.0
@@ -268,41 +398,39 @@ def categorize_data(decision_metrics, category_totals, statement_analysis):
         if not rent_found:
             continue
 
-        # Skip Insurance and (Once off) entries
-        if name == "Insurance - Monthly" or "(Once off)" in value_str:
+        # Skip Insurance, Wages, Centrelink, Loan-specific and (Once off) entries
+        if name in living_expenses_excluded or value_str.endswith(ONCE_OFF_SUFFIX):
             continue
 
         try:
             # Remove $ and convert to float
-            value = float(value_str.replace("$", "").replace(" (Once off)", ""))
+            value = float(value_str.replace("$", ""))
         except ValueError:
             value = 0.0
 
-        # Skip Wages, Centrelink, and Loan-specific categories
-        if name in ["Wages - Monthly", "Centrelink - Monthly", "SACC Loans - Monthly", "All Loans - Monthly"]:
-            continue
-
         # Add to living expenses total
         living_expenses_total += value
 
     # Convert monthly to fortnightly: (*12 months) / (26 fortnights)
-    category_totals["Living Expenses"] = round((living_expenses_total * 12) / 26, 2)
+    category_totals.living_expenses = round((living_expenses_total * 12) / 26, 2)
 
     # Ensure Centrelink value stays as per statement analysis
-    category_totals["Centrelink"] = centrelink_from_statement
+    category_totals.centrelink = centrelink_from_statement
+
+    return sacc_results
 
 
 def calculate_totals(category_totals):
-    total_income = round(sum(category_totals[cat] for cat in income_categories.values()), 2)
+    total_income = round(category_totals.wages + category_totals.centrelink, 2)
     
     # Calculate total SACC loans
-    total_sacc_loans = sum(category_totals["SACC"].values()) if isinstance(category_totals["SACC"], dict) else category_totals["SACC"]
+    total_sacc_loans = sum(category_totals.sacc.values())
     
     # Calculate total expenses
     total_expenses = round(
         total_sacc_loans + 
-        category_totals.get("Debt Collection", 0.0) + 
-        category_totals.get("Living Expenses", 0.0), 
+        category_totals.debt_collection + 
+        category_totals.living_expenses, 
         2
     )
     
@@ -316,22 +444,22 @@ def format_output(raw_data, category_totals, total_income, total_expenses, surpl
     link = f"https://admin.cashfaster.com.au/admin/loan/{loan_id}/show {account_holder}"
 
     # Format SACC Loans details
-    sacc_loans_details = " ".join([f"{party} SACC Loan: ${amount:.2f}" for party, amount in category_totals.get("SACC", {}).items()])
+    sacc_loans_details = " ".join([f"{party} SACC Loan: ${amount:.2f}" for party, amount in category_totals.sacc.items()])
 
     output = f"""
     {link}
-    Wages: ${category_totals.get("Wages", 0):.2f}
-    Centrelink: ${category_totals.get("Centrelink", 0):.2f}
+    Wages: ${category_totals.wages:.2f}
+    Centrelink: ${category_totals.centrelink:.2f}
     Total Income: ${total_income:.2f}
     SACC Loans: {{{sacc_loans_details}}}
     Non-SACC Loans: $0.00
     Wage Advance: $0.00
     BNPL: $0.00
-    Debt Collection: ${category_totals.get("Debt Collection", 0):.2f}
-    Living Expenses: ${category_totals.get("Living Expenses", 0):.2f}
-    Rent: ${category_totals.get("Rent", 0):.2f}
-    Gambling: ${category_totals.get("Gambling", 0):.2f}
-    Insurance: ${category_totals.get("Insurance", 0):.2f}
+    Debt Collection: ${category_totals.debt_collection:.2f}
+    Living Expenses: ${category_totals.living_expenses:.2f}
+    Rent: ${category_totals.rent:.2f}
+    Gambling: ${category_totals.gambling:.2f}
+    Insurance: ${category_totals.insurance:.2f}
     Total Expenses: ${total_expenses:.2f}
     """
     return output
@@ -339,29 +467,70 @@ def format_output(raw_data, category_totals, total_income, total_expenses, surpl
 def save_all_outputs_to_file(all_outputs):
     try:
         with open("all_loan_outputs.txt", "w") as text_file:
-            text_file.writelines(all_outputs)
+            text_file.write("".join(all_outputs))
         logging.info("All loan outputs saved to all_loan_outputs.txt")
     except IOError as e:
         logging.error(f"Failed to save outputs: {e}")
 
-def main():
-    all_outputs = []
-    for loan_id in application_id:
-        url = f"https://admin.cashfaster.com.au/bank-statement/{loan_id}"
-        raw_data = fetch_data(url)
-        if raw_data is None:
-            continue
+def summarize_loan(raw_data):
+    # CPU-only part of processing a loan, so it can run in a worker process.
+    # SACC repayments need the network and are filled in by complete_loan_async.
+    decision_metrics = parse_decision_metrics(raw_data)
+    statement_analysis = parse_statement_analysis(raw_data)
+    category_totals = CategoryTotals()
+    sacc_results = categorize_data(decision_metrics, category_totals, statement_analysis)
+    return category_totals, sacc_results
+
+async def complete_loan_async(session, loan_id, raw_data, category_totals, sacc_results):
+    apply_sacc_totals(category_totals, await fetch_sacc_repayments_async(session, sacc_results))
+
+    total_income, total_expenses, surplus = calculate_totals(category_totals)
+    return format_output(raw_data, category_totals, total_income, total_expenses, surplus, loan_id)
+
+async def process_loan_async(session, loan_id, raw_data):
+    # Keep the CPU-bound parse off the event loop so other requests aren't stalled
+    category_totals, sacc_results = await asyncio.to_thread(summarize_loan, raw_data)
+    return await complete_loan_async(session, loan_id, raw_data, category_totals, sacc_results)
+
+def create_async_session():
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=32),
+        timeout=aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1]),
+    )
 
-        decision_metrics = parse_decision_metrics(raw_data)
-        statement_analysis = parse_statement_analysis(raw_data)
-        category_totals = initialize_category_totals()
-        categorize_data(decision_metrics, category_totals, statement_analysis)
+async def main():
+    async with create_async_session() as session:
+        # Fetch every loan concurrently
+        tasks = [
+            fetch_data_async(session, f"https://admin.cashfaster.com.au/bank-statement/{loan_id}")
+            for loan_id in application_id
+        ]
+        all_raw_data = await asyncio.gather(*tasks)
+
+        loans = [
+            (loan_id, raw_data)
+            for loan_id, raw_data in zip(application_id, all_raw_data)
+            if raw_data is not None
+        ]
+
+        # Parsing and categorising are independent per loan, so spread batches across cores
+        if len(loans) > 1:
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor() as executor:
+                summaries = await asyncio.gather(
+                    *(loop.run_in_executor(executor, summarize_loan, raw_data) for _, raw_data in loans)
+                )
+        else:
+            summaries = [summarize_loan(raw_data) for _, raw_data in loans]
 
-        total_income, total_expenses, surplus = calculate_totals(category_totals)
-        output = format_output(raw_data, category_totals, total_income, total_expenses, surplus, loan_id)
-        all_outputs.append(output)
+        all_outputs = await asyncio.gather(
+            *(
+                complete_loan_async(session, loan_id, raw_data, category_totals, sacc_results)
+                for (loan_id, raw_data), (category_totals, sacc_results) in zip(loans, summaries)
+            )
+        )
 
     save_all_outputs_to_file(all_outputs)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file